@@ -1,86 +1,291 @@
 import os
-import json
-from flask import Flask, request, jsonify, render_template, g
-from PyPDF2 import PdfReader
+import orjson
+from flask import Flask, request, render_template, Response, stream_with_context
+import fitz  # PyMuPDF
 from dotenv import load_dotenv
+import hashlib
 import requests
-import time 
-import re 
-import sqlite3 
-from datetime import datetime 
-
-# Load environment variables from .env file
-load_dotenv()
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import time
+import re
+import sqlite3
+import queue
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
 
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  
-
-# Create uploads directory if it doesn't exist
-if not os.path.exists(app.config['UPLOAD_FOLDER']):
-    os.makedirs(app.config['UPLOAD_FOLDER'])
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in .env file. Please set it.")
+def get_api_key():
+    """
+    Reads the Gemini API key lazily, so importing the module (e.g. under
+    gunicorn --preload) never crashes a worker before it can log cleanly.
+    """
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in .env file. Please set it.")
+    return api_key
 
 GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:generateContent?key="
+GEMINI_STREAM_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-05-20:streamGenerateContent?alt=sse&key="
+
+# Stop extracting PDF text once we have this many characters; anything more
+# would not fit usefully into the Gemini prompt anyway.
+MAX_RESUME_CHARS = 12000
+
+# Cap on resume text embedded in the Gemini prompt, after normalization
+MAX_PROMPT_CHARS = 12000
+
+# Cap on resume text persisted per row, so payloads stay within a few
+# database pages instead of spilling into long overflow-page chains
+MAX_STORED_CHARS = MAX_PROMPT_CHARS
+
+# PDF extraction leaves runs of spaces and blank lines that only inflate
+# the prompt's token count; collapse them before building the prompt
+_WS_RUN_RE = re.compile(r"[ \t]+")
+_BLANK_RUN_RE = re.compile(r"\n{3,}")
+
+# Incremental parser for the streaming endpoint, which keeps the line-based
+# text format so each bullet can be forwarded as soon as its line completes
+_STREAM_PARSE_RE = re.compile(r"ATS Score:\s*(\d+)|^\s*[-•*]\s*(.+?)\s*$", re.MULTILINE)
+
+def json_response(payload, status=200):
+    """
+    Serializes a response with orjson, which emits UTF-8 bytes directly
+    and is several times faster than the stdlib encoder jsonify uses.
+    """
+    return Response(orjson.dumps(payload), status=status, mimetype="application/json")
+
+def normalize_resume_text(resume_text):
+    """
+    Collapses whitespace runs left by PDF extraction and truncates to the
+    prompt budget.
+    """
+    resume_text = _BLANK_RUN_RE.sub("\n\n", resume_text)
+    return _WS_RUN_RE.sub(" ", resume_text).strip()[:MAX_PROMPT_CHARS]
+
+# Shared session so Gemini calls reuse pooled keep-alive connections instead
+# of paying a TCP + TLS handshake per upload. Retries stay at the app level
+# (call_gemini_api_with_retry), so the transport itself never retries.
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=Retry(total=0))
+_session.mount("https://", _adapter)
+
+# Pool for outbound Gemini calls: the handler submits the call and can keep
+# doing local work (queueing the DB row is already fire-and-forget) while
+# the network round-trip is in flight, and max_workers caps concurrent
+# requests against the API.
+_executor = ThreadPoolExecutor(max_workers=8)
+
+# Structured-output schema: Gemini returns this JSON directly, so no
+# regex parsing of free-form text is needed on our side
+ATS_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "atsScore": {"type": "integer"},
+        "suggestions": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["atsScore", "suggestions"]
+}
 
 # SQLite Database Configuration
 DATABASE = 'resume_data.db'
 
+# Batched write queue: handlers queue (sql, params) pairs and a background
+# thread flushes them in batches, so each batch pays for one commit/fsync
+# instead of one per row.
+WRITE_BATCH_SIZE = 64
+WRITE_BATCH_WAIT = 0.1  # seconds to wait for more rows before flushing
+
+write_queue = queue.Queue()
+
+RESULTS_INSERT_SQL = "INSERT INTO results (timestamp, resume_text, job_type, ats_score, suggestions) VALUES (?, ?, ?, ?, ?)"
+CACHE_UPSERT_SQL = "INSERT OR REPLACE INTO cache (key, ats_score, suggestions) VALUES (?, ?, ?)"
+
+# In-process front cache over the persistent cache table, so repeat uploads
+# of the same resume/job type skip both SQLite and the Gemini round-trip.
+_analysis_cache = {}
+_ANALYSIS_CACHE_MAX = 512
+
+_local = threading.local()
+
 def get_db():
     """
-    Establishes a database connection or returns the existing one.
+    Returns this thread's SQLite connection, opening and configuring it on
+    first use. With WAL mode the per-thread connections can read while the
+    writer thread commits, and reuse keeps SQLite's statement cache warm
+    instead of paying connection setup per request.
     """
-    db = getattr(g, '_database', None)
-    if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row 
+    try:
+        return _local.db
+    except AttributeError:
+        pass
+    db = _local.db = sqlite3.connect(DATABASE, check_same_thread=False, isolation_level=None)
+    db.row_factory = sqlite3.Row
+    # WAL mode lets readers and the writer thread proceed concurrently,
+    # and synchronous=NORMAL avoids an fsync on every commit.
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("PRAGMA temp_store=MEMORY")
+    db.execute("PRAGMA cache_size=-20000")
     return db
 
-@app.teardown_appcontext
-def close_connection(exception):
+# Recency/job-type lookups are the natural read pattern for results;
+# declare the index up front so they never fall back to a table scan.
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS results (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        resume_text BLOB NOT NULL,
+        job_type TEXT NOT NULL,
+        ats_score INTEGER,
+        suggestions TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_results_job_ts ON results(job_type, timestamp DESC);
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        ats_score INTEGER,
+        suggestions TEXT
+    );
+'''
+
+def init_db():
     """
-    Closes the database connection at the end of the request.
+    Initializes the database schema if it doesn't exist, on a short-lived
+    connection that is closed rather than leaked.
     """
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
+    with closing(sqlite3.connect(DATABASE)) as db:
+        # Larger pages hold whole rows more often; only takes effect if
+        # set before the first table is created
+        db.execute("PRAGMA page_size=8192")
+        db.executescript(SCHEMA)
 
-def init_db():
+def db_writer():
     """
-    Initializes the database schema if it doesn't exist.
+    Background thread: drains the write queue and commits rows in batches,
+    one transaction (and one fsync) per batch instead of per row.
     """
-    with app.app_context():
+    while True:
+        pending = [write_queue.get()]
+        deadline = time.monotonic() + WRITE_BATCH_WAIT
+        while len(pending) < WRITE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(write_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        batches = {}
+        for sql, params in pending:
+            batches.setdefault(sql, []).append(params)
         db = get_db()
-        cursor = db.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                resume_text TEXT NOT NULL,
-                job_type TEXT NOT NULL,
-                ats_score INTEGER,
-                suggestions TEXT
-            )
-        ''')
-        db.commit()
-
-# Call init_db when the application starts
-with app.app_context():
-    init_db()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            for sql, rows in batches.items():
+                db.executemany(sql, rows)
+            db.execute("COMMIT")
+            app.logger.info(f"Flushed {len(pending)} row(s) to database.")
+        except sqlite3.Error as e:
+            app.logger.error(f"Error saving data to database: {e}")
+            # Leave no transaction open, or every later batch on this
+            # connection would fail with "cannot start a transaction
+            # within a transaction"
+            if db.in_transaction:
+                db.execute("ROLLBACK")
 
-def extract_text_from_pdf(pdf_path):
+def bulk_insert_results(rows):
     """
-    Extracts text from a given PDF file.
+    Inserts many result rows in a single transaction, reusing one prepared
+    statement via executemany. Any future bulk ingest path (re-scoring,
+    imports, admin tooling) should use this or the write queue — per-row
+    autocommit INSERTs are orders of magnitude slower.
     """
+    db = get_db()
     try:
-        reader = PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text
+        db.execute("BEGIN IMMEDIATE")
+        db.executemany(RESULTS_INSERT_SQL, rows)
+        db.execute("COMMIT")
+    except sqlite3.Error:
+        # Roll back so the shared thread-local connection is usable again
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        raise
+
+_writer_thread = None
+
+def _start_db_writer():
+    global _writer_thread
+    if _writer_thread is None:
+        _writer_thread = threading.Thread(target=db_writer, daemon=True)
+        _writer_thread.start()
+
+def compress_resume_text(resume_text):
+    """
+    Compresses resume text for storage; resumes are plain English and
+    shrink 3-5x, keeping the database small and its pages dense.
+    """
+    return sqlite3.Binary(zlib.compress(resume_text.encode("utf-8"), 6))
+
+def decompress_resume_text(blob):
+    """
+    Inverse of compress_resume_text for read paths.
+    """
+    return zlib.decompress(blob).decode("utf-8")
+
+def cache_key(resume_text, job_type):
+    """
+    Stable key for one (resume text, job type) analysis.
+    """
+    return hashlib.blake2b(resume_text.encode() + b"\0" + job_type.encode(), digest_size=16).hexdigest()
+
+def _remember_analysis(key, parsed_response):
+    """
+    Stores a parsed analysis in the bounded in-process cache.
+    """
+    if len(_analysis_cache) >= _ANALYSIS_CACHE_MAX:
+        # Default the pop: two threads can race to evict the same key
+        _analysis_cache.pop(next(iter(_analysis_cache)), None)
+    _analysis_cache[key] = parsed_response
+
+def get_cached_analysis(key):
+    """
+    Looks up a previous analysis, first in process memory, then in the
+    cache table. Returns None on a miss.
+    """
+    cached = _analysis_cache.get(key)
+    if cached is not None:
+        return cached
+    row = get_db().execute(
+        "SELECT ats_score, suggestions FROM cache WHERE key = ?", (key,)
+    ).fetchone()
+    if row is None:
+        return None
+    parsed_response = {"atsScore": row["ats_score"], "suggestions": orjson.loads(row["suggestions"])}
+    _remember_analysis(key, parsed_response)
+    return parsed_response
+
+def extract_text_from_pdf(pdf_bytes):
+    """
+    Extracts text from an in-memory PDF.
+    """
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        parts = []
+        chars = 0
+        for page_num in range(doc.page_count):
+            page_text = doc.load_page(page_num).get_text("text")
+            parts.append(page_text)
+            chars += len(page_text)
+            if chars > MAX_RESUME_CHARS:
+                # Enough context for scoring; skip the remaining pages
+                break
+        doc.close()
+        return "\n".join(parts)
     except Exception as e:
         app.logger.error(f"Error extracting text from PDF: {e}")
         return None
@@ -93,11 +298,22 @@ def call_gemini_api_with_retry(prompt, max_retries=5, initial_delay=1):
         try:
             headers = {'Content-Type': 'application/json'}
             payload = {
-                "contents": [{"parts": [{"text": prompt}]}]
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": {
+                    "response_mime_type": "application/json",
+                    "response_schema": ATS_RESPONSE_SCHEMA
+                }
             }
-            response = requests.post(f"{GEMINI_API_URL}{GEMINI_API_KEY}", headers=headers, json=payload, timeout=60)
-            response.raise_for_status() 
-            result = response.json()
+            # Read the body in fixed-size chunks into one growable buffer
+            # instead of letting requests materialize an intermediate
+            # content bytes object before parsing.
+            with _session.post(f"{GEMINI_API_URL}{get_api_key()}", headers=headers,
+                               data=orjson.dumps(payload), timeout=60, stream=True) as response:
+                response.raise_for_status()
+                body = bytearray()
+                for chunk in response.iter_content(65536):
+                    body.extend(chunk)
+            result = orjson.loads(memoryview(body))
 
             if result and result.get("candidates") and result["candidates"][0].get("content") and \
                result["candidates"][0]["content"].get("parts") and result["candidates"][0]["content"]["parts"][0].get("text"):
@@ -105,7 +321,7 @@ def call_gemini_api_with_retry(prompt, max_retries=5, initial_delay=1):
             else:
                 app.logger.warning(f"Gemini API response format unexpected: {result}")
                 return None
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             app.logger.error(f"Gemini API call failed (attempt {i+1}/{max_retries}): {e}")
             if i < max_retries - 1:
                 time.sleep(initial_delay * (2 ** i)) 
@@ -116,115 +332,261 @@ def call_gemini_api_with_retry(prompt, max_retries=5, initial_delay=1):
 
 def parse_ats_response(gemini_output):
     """
-    Parses the Gemini output for ATS score and suggestions.
-    Assumes Gemini output is structured like:
-    "ATS Score: 75/100\nSuggestions:\n- Suggestion 1\n- Suggestion 2"
+    Parses the structured JSON output from Gemini into score and suggestions.
     """
     if not gemini_output:
         return {"atsScore": "N/A", "suggestions": ["Could not get a response from AI."]}
 
-    score = "N/A"
-    suggestions = []
-
-    lines = gemini_output.split('\n')
-    for line in lines:
-
-        score_match = re.search(r"ATS Score:\s*(\d+)", line)
-        if score_match:
-            try:
-                score = int(score_match.group(1))
-            except ValueError:
-                pass 
-        elif line.strip().startswith("-"):
-            suggestions.append(line.strip().lstrip('- ').strip())
-        elif "Suggestions:" in line:
-            continue 
-        elif line.strip(): 
-             if not suggestions and "ATS Score:" not in line: 
-                 suggestions.append(line.strip())
-
-
-    if not suggestions and "N/A" not in str(score):
+    try:
+        result = orjson.loads(gemini_output)
+        score = result["atsScore"]
+        suggestions = result["suggestions"]
+    except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+        app.logger.warning(f"Unexpected Gemini JSON output: {e}")
+        return {"atsScore": "N/A", "suggestions": ["Could not parse response. Ensure the job type is clear."]}
+
+    if not suggestions:
         suggestions = ["No specific suggestions were provided, but ensure your resume closely matches the job description keywords."]
-    elif not suggestions: 
-        suggestions = ["Could not parse response or no specific suggestions provided. Ensure the job type is clear."]
 
     return {"atsScore": score, "suggestions": suggestions}
 
 
+def _record_result(resume_text, job_type, parsed_response):
+    """
+    Queues one analysis for the batched database writer.
+    """
+    timestamp = datetime.now().isoformat()
+
+    ats_score_val = parsed_response["atsScore"] if isinstance(parsed_response["atsScore"], int) else None
+
+    suggestions_json = orjson.dumps(parsed_response["suggestions"]).decode()
+
+    write_queue.put((RESULTS_INSERT_SQL, (timestamp, compress_resume_text(resume_text[:MAX_STORED_CHARS]), job_type, ats_score_val, suggestions_json)))
+
+def _sse_event(data):
+    """
+    Formats one Server-Sent Events frame.
+    """
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+# The landing page has no dynamic data, so it is rendered once and served
+# as a static body with caching headers rather than re-running Jinja per hit
+_index_html = None
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    global _index_html
+    if _index_html is None:
+        _index_html = render_template('index.html')
+    return Response(_index_html, mimetype="text/html",
+                    headers={"Cache-Control": "public, max-age=300"})
 
 @app.route('/upload_resume', methods=['POST'])
 def upload_resume():
     if 'resume' not in request.files:
-        return jsonify({"error": "No resume file part"}), 400
+        return json_response({"error": "No resume file part"}, 400)
     file = request.files['resume']
     if file.filename == '':
-        return jsonify({"error": "No selected file"}), 400
+        return json_response({"error": "No selected file"}, 400)
     if file and file.filename.endswith('.pdf'):
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
-
-        resume_text = extract_text_from_pdf(filepath)
-        os.remove(filepath) 
+        # Parse straight from the upload stream; no disk round-trip needed
+        pdf_bytes = file.read()
+        resume_text = extract_text_from_pdf(pdf_bytes)
+        if resume_text:
+            resume_text = normalize_resume_text(resume_text)
 
         if not resume_text:
-            return jsonify({"error": "Failed to extract text from PDF. Please ensure it's a searchable PDF."}), 500
+            return json_response({"error": "Failed to extract text from PDF. Please ensure it's a searchable PDF."}, 500)
 
         job_type = request.form.get('job_type', 'General Job').strip()
         if not job_type:
             job_type = 'General Job' # Default if not provided
 
-        # Prompt for ATS score and suggestions
-        ats_prompt = f"""
-        Analyze the following resume text against the job type "{job_type}" to determine an ATS (Applicant Tracking System) compatibility score out of 100.
-        Provide actionable suggestions to improve the resume's ATS score for this specific job type.
-        Focus on keywords, formatting that might hinder ATS, and overall relevance.
-        Structure your response clearly with the ATS Score on one line, followed by a "Suggestions:" heading, and then a bulleted list of suggestions.
-        Always include "/100" after the score.
-
-        Resume Text:
-        {resume_text}
-
-        Expected Output Format:
-        ATS Score: [SCORE]/100
-        Suggestions:
-        - Suggestion 1
-        - Suggestion 2
-        """
-
-        gemini_response = call_gemini_api_with_retry(ats_prompt)
-        parsed_response = parse_ats_response(gemini_response)
-
-        # Save results to SQLite database
-        db = get_db()
-        cursor = db.cursor()
-        try:
-            timestamp = datetime.now().isoformat()
-            
-            ats_score_val = parsed_response["atsScore"] if isinstance(parsed_response["atsScore"], int) else None
-            
-            suggestions_json = json.dumps(parsed_response["suggestions"])
-
-            cursor.execute(
-                "INSERT INTO results (timestamp, resume_text, job_type, ats_score, suggestions) VALUES (?, ?, ?, ?, ?)",
-                (timestamp, resume_text, job_type, ats_score_val, suggestions_json)
-            )
-            db.commit()
-            app.logger.info("Resume analysis results saved to database.")
-        except sqlite3.Error as e:
-            app.logger.error(f"Error saving data to database: {e}")
-
-
-        return jsonify({
+        # A repeat upload of the same resume for the same job type reuses
+        # the previous analysis instead of paying for another Gemini call
+        key = cache_key(resume_text, job_type)
+        parsed_response = get_cached_analysis(key)
+
+        if parsed_response is None:
+            # Prompt for ATS score and suggestions
+            ats_prompt = f"""
+            Analyze the following resume text against the job type "{job_type}" to determine an ATS (Applicant Tracking System) compatibility score out of 100.
+            Provide actionable suggestions to improve the resume's ATS score for this specific job type.
+            Focus on keywords, formatting that might hinder ATS, and overall relevance.
+
+            Resume Text:
+            {resume_text}
+            """
+
+            gemini_future = _executor.submit(call_gemini_api_with_retry, ats_prompt)
+            gemini_response = gemini_future.result()
+            parsed_response = parse_ats_response(gemini_response)
+
+            # Only successful analyses are worth caching
+            if isinstance(parsed_response["atsScore"], int):
+                _remember_analysis(key, parsed_response)
+                write_queue.put((
+                    CACHE_UPSERT_SQL,
+                    (key, parsed_response["atsScore"], orjson.dumps(parsed_response["suggestions"]).decode())
+                ))
+
+        _record_result(resume_text, job_type, parsed_response)
+
+        return json_response({
             "atsScore": parsed_response["atsScore"],
             "suggestions": parsed_response["suggestions"],
             "extracted_text": resume_text # Send extracted text back to frontend
         })
-    return jsonify({"error": "Invalid file type. Only PDF is supported."}), 400
+    return json_response({"error": "Invalid file type. Only PDF is supported."}, 400)
+
+@app.route('/upload_resume_stream', methods=['POST'])
+def upload_resume_stream():
+    """
+    Streaming variant of /upload_resume: suggestions are forwarded to the
+    browser over Server-Sent Events as Gemini produces them, so the user
+    sees first output at first-token latency instead of waiting for the
+    whole response.
+    """
+    if 'resume' not in request.files:
+        return json_response({"error": "No resume file part"}, 400)
+    file = request.files['resume']
+    if file.filename == '':
+        return json_response({"error": "No selected file"}, 400)
+    if not file.filename.endswith('.pdf'):
+        return json_response({"error": "Invalid file type. Only PDF is supported."}, 400)
+
+    pdf_bytes = file.read()
+    resume_text = extract_text_from_pdf(pdf_bytes)
+    if resume_text:
+        resume_text = normalize_resume_text(resume_text)
+
+    if not resume_text:
+        return json_response({"error": "Failed to extract text from PDF. Please ensure it's a searchable PDF."}, 500)
+
+    job_type = request.form.get('job_type', 'General Job').strip()
+    if not job_type:
+        job_type = 'General Job' # Default if not provided
+
+    key = cache_key(resume_text, job_type)
+    cached_response = get_cached_analysis(key)
+
+    # The streaming path keeps the line-based text format (rather than the
+    # JSON schema) so each suggestion line can be parsed and forwarded the
+    # moment it completes.
+    ats_prompt = f"""
+    Analyze the following resume text against the job type "{job_type}" to determine an ATS (Applicant Tracking System) compatibility score out of 100.
+    Provide actionable suggestions to improve the resume's ATS score for this specific job type.
+    Focus on keywords, formatting that might hinder ATS, and overall relevance.
+    Structure your response with the ATS Score on one line, followed by a "Suggestions:" heading, and then a bulleted list of suggestions.
+
+    Resume Text:
+    {resume_text}
+
+    Expected Output Format:
+    ATS Score: [SCORE]/100
+    Suggestions:
+    - Suggestion 1
+    - Suggestion 2
+    """
+
+    def generate():
+        if cached_response is not None:
+            yield _sse_event({"atsScore": cached_response["atsScore"]})
+            for suggestion in cached_response["suggestions"]:
+                yield _sse_event({"suggestion": suggestion})
+            yield _sse_event({"done": True, "extracted_text": resume_text})
+            _record_result(resume_text, job_type, cached_response)
+            return
+
+        headers = {'Content-Type': 'application/json'}
+        payload = {"contents": [{"parts": [{"text": ats_prompt}]}]}
+        buffer = ""
+        score = None
+        suggestions = []
+
+        def parse_progress(text):
+            # Re-scan the buffer and emit only what hasn't been sent yet
+            nonlocal score
+            new_events = []
+            found = []
+            for match in _STREAM_PARSE_RE.finditer(text):
+                if match.group(1):
+                    if score is None:
+                        score = int(match.group(1))
+                        new_events.append({"atsScore": score})
+                elif match.group(2):
+                    found.append(match.group(2))
+            for suggestion in found[len(suggestions):]:
+                suggestions.append(suggestion)
+                new_events.append({"suggestion": suggestion})
+            return new_events
+
+        try:
+            with _session.post(f"{GEMINI_STREAM_API_URL}{get_api_key()}", headers=headers,
+                               data=orjson.dumps(payload), stream=True, timeout=60) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line.startswith(b"data: "):
+                        continue
+                    try:
+                        chunk = orjson.loads(line[6:])
+                    except orjson.JSONDecodeError:
+                        # Sentinel or garbled frame; skip it rather than
+                        # aborting the stream and losing the result
+                        app.logger.warning(f"Skipping unparseable SSE frame: {line[:80]}")
+                        continue
+                    candidates = chunk.get("candidates")
+                    if not candidates:
+                        continue
+                    parts = candidates[0].get("content", {}).get("parts")
+                    if not parts or "text" not in parts[0]:
+                        continue
+                    buffer += parts[0]["text"]
+                    # Only complete lines are parseable; keep the tail
+                    for event in parse_progress(buffer[:buffer.rfind("\n") + 1]):
+                        yield _sse_event(event)
+        except requests.exceptions.RequestException as e:
+            app.logger.error(f"Gemini streaming call failed: {e}")
+            yield _sse_event({"error": "Could not get a response from AI."})
+            return
+
+        # Flush anything left on the final, unterminated line
+        for event in parse_progress(buffer):
+            yield _sse_event(event)
+
+        parsed_response = {
+            "atsScore": score if score is not None else "N/A",
+            "suggestions": suggestions or ["Could not parse response. Ensure the job type is clear."]
+        }
+        if isinstance(parsed_response["atsScore"], int):
+            _remember_analysis(key, parsed_response)
+            write_queue.put((
+                CACHE_UPSERT_SQL,
+                (key, parsed_response["atsScore"], orjson.dumps(parsed_response["suggestions"]).decode())
+            ))
+        _record_result(resume_text, job_type, parsed_response)
+        yield _sse_event({"done": True, "extracted_text": resume_text})
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream")
+
+
+def create_app():
+    """
+    Application entry point: loads .env, ensures the schema exists, and
+    starts the background writer. Kept out of import time so merely
+    importing the module (gunicorn worker forks, tests) has no side
+    effects and missing configuration fails at startup, not at import.
+    """
+    global _index_html
+    load_dotenv()
+    get_api_key()  # fail at startup, not on the first upload
+    init_db()
+    _start_db_writer()
+    with app.app_context():
+        _index_html = render_template('index.html')
+    return app
 
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file